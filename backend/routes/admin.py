@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import os
+import hmac
+
+from services.profiling import ProfilingService
+
+router = APIRouter()
+
+# Initialize service
+profiling_service = ProfilingService()
+
+def verify_admin_token(x_admin_token: Optional[str]):
+    """Admin endpoints are disabled unless ADMIN_TOKEN is configured"""
+    admin_token = os.getenv('ADMIN_TOKEN')
+    if not admin_token or not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Admin access denied")
+
+@router.post("/admin/profile")
+async def profile_worker(
+    seconds: float = Query(10, description="Sampling duration in seconds (max 60)"),
+    format: str = Query("json", description="Output format: json or collapsed"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Run the sampling profiler on this worker for N seconds"""
+    verify_admin_token(x_admin_token)
+
+    profile = await profiling_service.profile_worker(seconds)
+
+    if format == "collapsed":
+        return PlainTextResponse(profile['collapsed'])
+
+    return {
+        'success': True,
+        'profile': profile
+    }
+
+@router.get("/admin/profiles")
+async def list_request_profiles(x_admin_token: Optional[str] = Header(None)):
+    """List recently captured per-request profiles"""
+    verify_admin_token(x_admin_token)
+
+    return {
+        'success': True,
+        'profiles': profiling_service.list_profiles()
+    }
+
+@router.get("/admin/profiles/{profile_id}")
+async def get_request_profile(
+    profile_id: str,
+    format: str = Query("json", description="Output format: json or collapsed"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Get a per-request profile captured via the X-Profile header.
+    
+    Samples come from the whole event-loop thread, so work from requests that ran
+    concurrently is included; peak_concurrent_requests shows how many overlapped.
+    """
+    verify_admin_token(x_admin_token)
+
+    profile = profiling_service.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "collapsed":
+        return PlainTextResponse(profile['collapsed'])
+
+    return {
+        'success': True,
+        'profile': profile
+    }
+
+@router.get("/admin/loop-lag")
+async def get_loop_lag(x_admin_token: Optional[str] = Header(None)):
+    """Get event-loop lag measured by the background monitor"""
+    verify_admin_token(x_admin_token)
+
+    return {
+        'success': True,
+        'enabled': profiling_service.enabled,
+        'loop_lag': profiling_service.loop_lag_monitor.get_stats()
+    }
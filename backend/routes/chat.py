@@ -1,19 +1,38 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 import json
+import time
+import logging
 import uuid
 from datetime import datetime
 
-from services.contentstack import ContentstackService
 from services.llm import LLMService
+from services.fast_path import FastPathService
+from services.deadline import Deadline, DeadlineExceeded, DEADLINE_EXCEEDED_MESSAGE
+from services.agents import DEFAULT_AGENT_ID, AgentRuntime, AgentNotFound, AgentBusy, AgentQuotaExceeded
+from services.prefetch import PrefetchService
+from services.shared import agent_manager, task_queue
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 # Initialize services
-contentstack_service = ContentstackService()
 llm_service = LLMService()
+fast_path_service = FastPathService()
+prefetch_service = PrefetchService(llm_service)
+
+# Shortest partial query worth prefetching for
+MIN_PREFETCH_QUERY_LENGTH = 3
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "*",
+}
 
 class ChatRequest(BaseModel):
     query: str
@@ -27,24 +46,145 @@ class ChatResponse(BaseModel):
     sessionId: str
     relatedContent: Optional[list] = None
 
+async def acquire_agent(request: ChatRequest) -> AgentRuntime:
+    """Resolve the agent for a request (context.agentId or context.stack) and reserve a slot"""
+    context = request.context or {}
+    agent_id = context.get('agentId') or context.get('stack')
+    try:
+        return await agent_manager.acquire(agent_id)
+    except AgentNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except AgentBusy as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except AgentQuotaExceeded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+class AgentStreamingResponse(StreamingResponse):
+    """Streaming response that returns its agent slot however the response ends.
+    
+    Background tasks are skipped when the body iterator or send raises, so they can't release the slot.
+    """
+    
+    def __init__(self, content, runtime: AgentRuntime, **kwargs):
+        super().__init__(content, **kwargs)
+        self.runtime = runtime
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            agent_manager.release(self.runtime)
+
+def record_exchange(
+    runtime: AgentRuntime,
+    session_id: str,
+    query: str,
+    message: Dict[str, Any],
+    started: float
+):
+    """Queue the transcript and metrics event for a finished exchange, off the request path"""
+    latency_ms = round((time.perf_counter() - started) * 1000, 2)
+    task_queue.enqueue('transcript', {
+        'session_id': session_id,
+        'agent_id': runtime.agent.agent_id,
+        'query': query,
+        'response': message.get('content', ''),
+        'provider': message.get('provider'),
+        'timestamp': datetime.utcnow()
+    })
+    task_queue.enqueue('metrics', {
+        'agent_id': runtime.agent.agent_id,
+        'provider': message.get('provider'),
+        'latency_ms': latency_ms,
+        'fast_path': message.get('fast_path', False),
+        'error': message.get('error', False),
+        'deadline_exceeded': message.get('deadline_exceeded', False),
+        'timestamp': datetime.utcnow()
+    })
+
+async def prepare_llm_inputs(
+    runtime: AgentRuntime,
+    request: ChatRequest,
+    session_id: str,
+    deadline: Deadline
+) -> Dict[str, Any]:
+    """Get search results, context block and chat session, reusing prefetched ones when available"""
+    agent_id = runtime.agent.agent_id
+    
+    prefetched = prefetch_service.take_content(agent_id, request.query)
+    if prefetched:
+        content_context = prefetched['content_context']
+        context_str = prefetched['context_str']
+    else:
+        content_context = await deadline.run(
+            runtime.contentstack_service.search_content(request.query), 'content search'
+        )
+        context_str = None
+    
+    chat = prefetch_service.take_session(
+        agent_id, session_id, llm_service.resolve_provider(request.provider, runtime.agent)
+    )
+    
+    return {
+        'content_context': content_context,
+        'context_str': context_str,
+        'chat': chat,
+        'prefetch_hit': prefetched is not None or chat is not None
+    }
+
 @router.post("/chat")
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(
+    request: ChatRequest,
+    x_request_deadline: Optional[str] = Header(None)
+):
     """Handle chat requests with content-aware responses"""
+    deadline = Deadline.from_header(x_request_deadline)
+    runtime = await acquire_agent(request)
+    contentstack_service = runtime.contentstack_service
+    # Provider label for every reply, following the agent's provider policy
+    provider = llm_service.resolve_provider(request.provider, runtime.agent)
+    started = time.perf_counter()
+    # Generate session ID if not provided
+    session_id = request.sessionId or f"session_{uuid.uuid4().hex[:8]}"
     try:
-        # Generate session ID if not provided
-        session_id = request.sessionId or f"session_{uuid.uuid4().hex[:8]}"
+        # Answer plain catalog lookups directly without an LLM round-trip
+        fast_answer = await fast_path_service.try_answer(request.query, contentstack_service, runtime.agent.fast_path)
+        if fast_answer:
+            message = {
+                'role': 'assistant',
+                'content': fast_answer['content'],
+                'timestamp': datetime.utcnow().isoformat(),
+                'provider': provider,
+                'fast_path': True
+            }
+            record_exchange(runtime, session_id, request.query, message, started)
+            
+            return ChatResponse(
+                success=True,
+                message=message,
+                sessionId=session_id,
+                relatedContent=fast_answer['related_content']
+            )
         
         # Get relevant content from Contentstack based on query
-        content_context = await contentstack_service.search_content(request.query)
+        llm_inputs = await prepare_llm_inputs(runtime, request, session_id, deadline)
+        content_context = llm_inputs['content_context']
         
         # Get LLM response with content context
         response_data = await llm_service.get_chat_response(
             query=request.query,
             session_id=session_id,
             provider=request.provider,
-            content_context=content_context
+            content_context=content_context,
+            deadline=deadline,
+            agent=runtime.agent,
+            chat=llm_inputs['chat'],
+            context_str=llm_inputs['context_str']
         )
         
+        if response_data['success']:
+            fast_path_service.record_llm_latency(time.perf_counter() - started)
+        
         if not response_data['success']:
             raise HTTPException(status_code=500, detail=response_data.get('error', 'LLM service error'))
         
@@ -59,6 +199,7 @@ async def chat_endpoint(request: ChatRequest):
             'timestamp': response_data['timestamp'],
             'provider': response_data['provider']
         }
+        record_exchange(runtime, session_id, request.query, message, started)
         
         return ChatResponse(
             success=True,
@@ -67,85 +208,205 @@ async def chat_endpoint(request: ChatRequest):
             relatedContent=related_content
         )
         
+    except DeadlineExceeded as e:
+        timeout_message = {
+            'role': 'assistant',
+            'content': DEADLINE_EXCEEDED_MESSAGE,
+            'timestamp': datetime.utcnow().isoformat(),
+            'provider': provider,
+            'error': True,
+            'deadline_exceeded': True,
+            'stage': e.stage
+        }
+        record_exchange(runtime, session_id, request.query, timeout_message, started)
+        
+        return ChatResponse(
+            success=True,  # Still return success to avoid frontend errors
+            message=timeout_message,
+            sessionId=session_id
+        )
+        
     except Exception as e:
         # Fallback response
         fallback_message = {
             'role': 'assistant',
             'content': f"I apologize, but I'm experiencing technical difficulties. Please try again in a moment. Error: {str(e)}",
             'timestamp': datetime.utcnow().isoformat(),
-            'provider': request.provider or 'groq',
+            'provider': provider,
             'error': True
         }
+        record_exchange(runtime, session_id, request.query, fallback_message, started)
         
         return ChatResponse(
             success=True,  # Still return success to avoid frontend errors
             message=fallback_message,
-            sessionId=request.sessionId or f"session_{uuid.uuid4().hex[:8]}"
+            sessionId=session_id
         )
+    
+    finally:
+        agent_manager.release(runtime)
 
 @router.post("/chat/stream")
-async def stream_chat_endpoint(request: ChatRequest):
+async def stream_chat_endpoint(
+    request: ChatRequest,
+    x_request_deadline: Optional[str] = Header(None)
+):
     """Handle streaming chat requests"""
+    deadline = Deadline.from_header(x_request_deadline)
+    runtime = await acquire_agent(request)
+    provider = llm_service.resolve_provider(request.provider, runtime.agent)
+    started = time.perf_counter()
     try:
         # Generate session ID if not provided
         session_id = request.sessionId or f"session_{uuid.uuid4().hex[:8]}"
         
+        # Answer plain catalog lookups as a single complete chunk, without an LLM round-trip
+        fast_answer = await fast_path_service.try_answer(
+            request.query, runtime.contentstack_service, runtime.agent.fast_path
+        )
+        if fast_answer:
+            message = {
+                'content': fast_answer['content'],
+                'is_complete': True,
+                'provider': provider,
+                'timestamp': datetime.utcnow().isoformat(),
+                'fast_path': True,
+                'relatedContent': fast_answer['related_content']
+            }
+            record_exchange(runtime, session_id, request.query, message, started)
+            
+            async def fast_path_stream():
+                yield "data: {}\n\n".format(json.dumps({
+                    'type': 'start',
+                    'sessionId': session_id,
+                    'provider': message['provider']
+                }))
+                yield f"data: {json.dumps(message)}\n\n"
+                yield "data: [DONE]\n\n"
+            
+            agent_manager.release(runtime)
+            return StreamingResponse(fast_path_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+        
         # Get relevant content from Contentstack
-        content_context = await contentstack_service.search_content(request.query)
+        llm_inputs = await prepare_llm_inputs(runtime, request, session_id, deadline)
         
         # Create streaming response
         async def generate_stream():
+            last_chunk = None
             yield "data: {}\n\n".format(json.dumps({
                 'type': 'start',
                 'sessionId': session_id,
-                'provider': request.provider or 'groq'
+                'provider': provider
             }))
             
             async for chunk in llm_service.stream_chat_response(
                 query=request.query,
                 session_id=session_id,
                 provider=request.provider,
-                content_context=content_context
+                content_context=llm_inputs['content_context'],
+                deadline=deadline,
+                agent=runtime.agent,
+                chat=llm_inputs['chat'],
+                context_str=llm_inputs['context_str']
             ):
+                if last_chunk is None:
+                    first_token_seconds = time.perf_counter() - started
+                    prefetch_service.record_time_to_first_token(first_token_seconds, llm_inputs['prefetch_hit'])
+                    # The first chunk arrives once the provider has answered, which is what a fast-path hit saves
+                    if 'error' not in json.loads(chunk[len("data: "):]):
+                        fast_path_service.record_llm_latency(first_token_seconds)
+                last_chunk = chunk
                 yield chunk
             
             yield "data: [DONE]\n\n"
+            
+            # The last chunk carries the complete response
+            if last_chunk:
+                record_exchange(runtime, session_id, request.query, json.loads(last_chunk[len("data: "):]), started)
         
-        return StreamingResponse(
+        # Release the agent slot once the stream has finished, failed or the client disconnected
+        return AgentStreamingResponse(
             generate_stream(),
+            runtime=runtime,
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "*",
-            }
+            headers=SSE_HEADERS
         )
         
+    except DeadlineExceeded as e:
+        agent_manager.release(runtime)
+        
+        # Ran out of time before streaming started (e.g. during content search)
+        deadline_data = llm_service.deadline_exceeded_data(e, provider)
+        
+        async def deadline_stream():
+            yield f"data: {json.dumps(deadline_data)}\n\n"
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(deadline_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+        
     except Exception as e:
-        # Return error stream
+        agent_manager.release(runtime)
+        
+        # Return error stream (built here, since `e` is unbound once the except block ends)
+        error_data = {
+            'error': str(e),
+            'content': "I apologize, but I'm experiencing technical difficulties. Please try again in a moment.",
+            'is_complete': True,
+            'provider': provider,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        
         async def error_stream():
-            error_data = {
-                'error': str(e),
-                'content': "I apologize, but I'm experiencing technical difficulties. Please try again in a moment.",
-                'is_complete': True,
-                'provider': request.provider or 'groq',
-                'timestamp': datetime.utcnow().isoformat()
-            }
             yield f"data: {json.dumps(error_data)}\n\n"
             yield "data: [DONE]\n\n"
         
         return StreamingResponse(
             error_stream(),
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "*",
-            }
+            headers=SSE_HEADERS
         )
 
+@router.post("/chat/prefetch")
+async def prefetch_endpoint(request: ChatRequest):
+    """Warm search results, context and a chat session for a partial query while the user types"""
+    if len(request.query.strip()) < MIN_PREFETCH_QUERY_LENGTH:
+        return {'success': True, 'prefetched': False}
+    
+    # Prefetches are best-effort: they don't take a chat slot, and are skipped rather than rejected
+    context = request.context or {}
+    agent_id = context.get('agentId') or context.get('stack') or DEFAULT_AGENT_ID
+    try:
+        runtime = await agent_manager.get_runtime(agent_id)
+        prefetched = await prefetch_service.prefetch(runtime, request.query, request.sessionId, request.provider)
+    except AgentNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except AgentQuotaExceeded:
+        prefetched = False
+    except Exception as e:
+        # e.g. a live stack's Delivery API failing; the real request will retry the search
+        logger.warning(f"Prefetch for agent {agent_id} failed: {e}")
+        prefetched = False
+    return {'success': True, 'prefetched': prefetched}
+
+@router.get("/chat/metrics")
+async def get_chat_metrics():
+    """Get chat pipeline metrics, including fast-path hit rate and latency saved"""
+    return {
+        'success': True,
+        'fast_path': fast_path_service.get_metrics(),
+        'agents': agent_manager.get_stats(),
+        'task_queue': task_queue.get_stats(),
+        'prefetch': prefetch_service.get_metrics()
+    }
+
+@router.get("/chat/agents")
+async def get_agents():
+    """Get agents hosted by this process"""
+    return {
+        'success': True,
+        'agents': agent_manager.list_agents()
+    }
+
 @router.get("/chat/providers")
 async def get_providers():
     """Get available LLM providers"""
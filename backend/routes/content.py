@@ -3,11 +3,22 @@ from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 
 from services.contentstack import ContentstackService
+from services.agents import AgentNotFound, AgentQuotaExceeded
+from services.shared import agent_manager
 
 router = APIRouter()
 
-# Initialize service
-contentstack_service = ContentstackService()
+AGENT_ID_QUERY = Query(None, description="Agent whose stack to read (defaults to the travel agent)")
+
+async def get_contentstack_service(agent_id: Optional[str]) -> ContentstackService:
+    """Resolve the agent's Contentstack service; content reads don't take a chat concurrency slot"""
+    try:
+        runtime = await agent_manager.get_runtime(agent_id)
+    except AgentNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except AgentQuotaExceeded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return runtime.contentstack_service
 
 class ToursResponse(BaseModel):
     success: bool
@@ -28,9 +39,11 @@ class SearchResponse(BaseModel):
 async def get_tours(
     location: Optional[str] = Query(None, description="Filter by location"),
     category: Optional[str] = Query(None, description="Filter by category"),
-    max_price: Optional[int] = Query(None, description="Maximum price filter")
+    max_price: Optional[int] = Query(None, description="Maximum price filter"),
+    agentId: Optional[str] = AGENT_ID_QUERY
 ):
     """Get all tours with optional filtering"""
+    contentstack_service = await get_contentstack_service(agentId)
     try:
         filters = {}
         if location:
@@ -52,8 +65,9 @@ async def get_tours(
         raise HTTPException(status_code=500, detail=f"Failed to fetch tours: {str(e)}")
 
 @router.get("/content/tours/{tour_uid}")
-async def get_tour_by_uid(tour_uid: str):
+async def get_tour_by_uid(tour_uid: str, agentId: Optional[str] = AGENT_ID_QUERY):
     """Get specific tour by UID"""
+    contentstack_service = await get_contentstack_service(agentId)
     try:
         tour = await contentstack_service.get_tour_by_uid(tour_uid)
         
@@ -71,8 +85,9 @@ async def get_tour_by_uid(tour_uid: str):
         raise HTTPException(status_code=500, detail=f"Failed to fetch tour: {str(e)}")
 
 @router.get("/content/destinations", response_model=DestinationsResponse)
-async def get_destinations():
+async def get_destinations(agentId: Optional[str] = AGENT_ID_QUERY):
     """Get all destinations"""
+    contentstack_service = await get_contentstack_service(agentId)
     try:
         destinations = await contentstack_service.get_destinations()
         
@@ -86,8 +101,12 @@ async def get_destinations():
         raise HTTPException(status_code=500, detail=f"Failed to fetch destinations: {str(e)}")
 
 @router.get("/content/search", response_model=SearchResponse)
-async def search_content(q: str = Query(..., description="Search query")):
+async def search_content(
+    q: str = Query(..., description="Search query"),
+    agentId: Optional[str] = AGENT_ID_QUERY
+):
     """Search across all content types"""
+    contentstack_service = await get_contentstack_service(agentId)
     try:
         results = await contentstack_service.search_content(q)
         
@@ -101,8 +120,9 @@ async def search_content(q: str = Query(..., description="Search query")):
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 @router.get("/content/categories")
-async def get_categories():
+async def get_categories(agentId: Optional[str] = AGENT_ID_QUERY):
     """Get available tour categories"""
+    contentstack_service = await get_contentstack_service(agentId)
     try:
         tours = await contentstack_service.get_tours()
         categories = list(set(tour['category'] for tour in tours))
@@ -116,8 +136,9 @@ async def get_categories():
         raise HTTPException(status_code=500, detail=f"Failed to fetch categories: {str(e)}")
 
 @router.get("/content/locations")
-async def get_locations():
+async def get_locations(agentId: Optional[str] = AGENT_ID_QUERY):
     """Get available tour locations"""
+    contentstack_service = await get_contentstack_service(agentId)
     try:
         tours = await contentstack_service.get_tours()
         locations = list(set(tour['location'] for tour in tours))
@@ -2,6 +2,7 @@ from fastapi import FastAPI, APIRouter
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
 import os
 import logging
 from pathlib import Path
@@ -11,7 +12,9 @@ import uuid
 from datetime import datetime
 
 # Import route modules
-from routes import chat, content
+from routes import chat, content, admin
+from services.profiling import ProfilingMiddleware
+from services.shared import agent_manager, task_queue
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -54,7 +57,9 @@ async def root():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    # Insert in the background; fall back to an inline write if the queue is full
+    if not task_queue.enqueue('status_check', status_obj.dict()):
+        _ = await db.status_checks.insert_one(status_obj.dict())
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
@@ -77,6 +82,7 @@ async def health_check():
 # Include route modules
 api_router.include_router(chat.router, tags=["chat"])
 api_router.include_router(content.router, tags=["content"])
+api_router.include_router(admin.router, tags=["admin"])
 
 # Include the main router in the app
 app.include_router(api_router)
@@ -89,6 +95,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Only install the profiling middleware when enabled, so it costs nothing otherwise
+if admin.profiling_service.enabled:
+    app.add_middleware(ProfilingMiddleware, profiling_service=admin.profiling_service)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -96,6 +106,44 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Background task handlers, each receiving a batch of payloads
+async def insert_batch(collection, docs):
+    """Insert a batch so that a retry skips the documents already written"""
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # Duplicate key errors mean the document was written by an earlier attempt
+        if any(error['code'] != 11000 for error in e.details.get('writeErrors', [])):
+            raise
+
+async def insert_status_checks(docs):
+    await insert_batch(db.status_checks, docs)
+
+async def insert_transcripts(docs):
+    await insert_batch(db.chat_transcripts, docs)
+
+async def insert_metrics(docs):
+    await insert_batch(db.chat_metrics, docs)
+
+task_queue.register_handler('status_check', insert_status_checks)
+task_queue.register_handler('transcript', insert_transcripts)
+task_queue.register_handler('metrics', insert_metrics)
+
+@app.on_event("startup")
+async def start_task_queue():
+    task_queue.start()
+
+@app.on_event("startup")
+async def load_agents():
+    await agent_manager.load_definitions(db)
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    admin.profiling_service.start_loop_lag_monitor()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await admin.profiling_service.stop_loop_lag_monitor()
+    # Flush queued post-response work before closing the database connection
+    await task_queue.drain()
     client.close()
@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from pydantic import BaseModel, Field
+
+from services.contentstack import ContentstackService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AGENT_ID = 'travel'
+
+# Process-wide limits for hosted agents
+MAX_LOADED_AGENTS = int(os.getenv('AGENT_MAX_LOADED', '200'))
+AGENT_IDLE_SECONDS = float(os.getenv('AGENT_IDLE_SECONDS', '900'))
+AGENT_MEMORY_BUDGET_MB = float(os.getenv('AGENT_MEMORY_BUDGET_MB', '512'))
+# How long an over-quota agent is refused before its snapshot is rebuilt and measured again
+AGENT_QUOTA_RETRY_SECONDS = float(os.getenv('AGENT_QUOTA_RETRY_SECONDS', '60'))
+
+TRAVEL_SYSTEM_MESSAGE = """You are a professional Travel Assistant specializing in Italian tourism. You help users discover amazing tours, destinations, and travel experiences.
+
+GUIDELINES:
+- Be enthusiastic and knowledgeable about travel
+- Provide specific, actionable information
+- Include prices, durations, and key highlights when available
+- Suggest related tours and destinations
+- Use emojis sparingly for visual appeal
+- Format responses with clear structure (use **bold** for important info)
+- If you don't have specific information, acknowledge it and provide general helpful advice
+
+CONTEXT: You have access to real-time tour and destination data from our content management system. Use this information to provide accurate, up-to-date recommendations."""
+
+class AgentError(Exception):
+    """Base error for agent lookup and quota failures"""
+
+class AgentNotFound(AgentError):
+    def __init__(self, agent_id: str):
+        self.agent_id = agent_id
+        super().__init__(f"Unknown agent: {agent_id}")
+
+class AgentBusy(AgentError):
+    def __init__(self, agent_id: str, max_concurrency: int):
+        self.agent_id = agent_id
+        super().__init__(f"Agent {agent_id} is at its concurrency limit ({max_concurrency})")
+
+class AgentQuotaExceeded(AgentError):
+    def __init__(self, agent_id: str, size_mb: float, max_memory_mb: float):
+        self.agent_id = agent_id
+        super().__init__(f"Agent {agent_id} content snapshot ({size_mb:.1f} MB) exceeds its {max_memory_mb} MB quota")
+
+class ProviderPolicy(BaseModel):
+    default_provider: str = 'groq'
+    allowed_providers: List[str] = Field(default_factory=lambda: ['groq', 'openai', 'claude'])
+    fastest_provider: str = 'groq'
+
+class FastPathTemplates(BaseModel):
+    """Templates for answers served by the catalog fast path, filled with str.format"""
+    price: str
+    tour_list: str
+    tour_list_item: str
+    no_results: str
+    category_criteria: str
+    location_criteria: str
+    price_criteria: str
+    categories: str
+    locations: str
+    list_item: str
+
+class AgentDefinition(BaseModel):
+    agent_id: str
+    name: str
+    system_message: str
+    # Contentstack stack credentials, content type UIDs, `live` (fetch from the Delivery API)
+    # and optional inline sample_data. None uses the built-in travel sample data.
+    contentstack: Optional[Dict[str, Any]] = None
+    provider_policy: ProviderPolicy = Field(default_factory=ProviderPolicy)
+    # Catalog lookups are answered without the LLM only for agents that define templates
+    fast_path: Optional[FastPathTemplates] = None
+    max_concurrency: int = 20
+    max_memory_mb: float = 50
+
+TRAVEL_FAST_PATH_TEMPLATES = FastPathTemplates(
+    price="The **{title}** costs **{price}** for {duration} in {location}.\n\nHighlights: {highlights}\nRating: {rating}/5",
+    tour_list="Here are the tours {criteria}:",
+    tour_list_item="• **{title}** - {price} ({duration}), {location}",
+    no_results="I couldn't find any tours {criteria}. Try widening your search!",
+    category_criteria="in the **{category}** category",
+    location_criteria="in **{location}**",
+    price_criteria="under **${max_price}**",
+    categories="We offer tours in these categories:\n{items}",
+    locations="We currently run tours in:\n{items}",
+    list_item="• **{value}**"
+)
+
+TRAVEL_AGENT = AgentDefinition(
+    agent_id=DEFAULT_AGENT_ID,
+    name="Italian Travel Assistant",
+    system_message=TRAVEL_SYSTEM_MESSAGE,
+    fast_path=TRAVEL_FAST_PATH_TEMPLATES
+)
+
+class AgentRuntime:
+    """Loaded state for one agent: its content snapshot, search index and usage counters"""
+
+    def __init__(self, agent: AgentDefinition):
+        self.agent = agent
+        self.contentstack_service = ContentstackService(agent.contentstack)
+        self.memory_bytes = 0
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+
+    async def load(self):
+        """Build the content snapshot and enforce the agent's memory quota"""
+        self.memory_bytes = await self.contentstack_service.build_snapshot()
+        size_mb = self.memory_bytes / (1024 * 1024)
+        if size_mb > self.agent.max_memory_mb:
+            raise AgentQuotaExceeded(self.agent.agent_id, size_mb, self.agent.max_memory_mb)
+
+class AgentManager:
+    """Hosts many agents per process, loading them lazily and unloading idle ones (LRU)"""
+
+    def __init__(
+        self,
+        max_loaded: int = MAX_LOADED_AGENTS,
+        idle_seconds: float = AGENT_IDLE_SECONDS,
+        memory_budget_mb: float = AGENT_MEMORY_BUDGET_MB,
+        quota_retry_seconds: float = AGENT_QUOTA_RETRY_SECONDS
+    ):
+        self.max_loaded = max_loaded
+        self.idle_seconds = idle_seconds
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self.quota_retry_seconds = quota_retry_seconds
+
+        self.definitions: Dict[str, AgentDefinition] = {}
+        self.runtimes: "OrderedDict[str, AgentRuntime]" = OrderedDict()
+        # In-progress loads, awaited by every request for the same agent
+        self._loading: Dict[str, "asyncio.Future[AgentRuntime]"] = {}
+        # Recent quota failures: agent_id -> (retry after, error)
+        self._quota_failures: Dict[str, Tuple[float, AgentQuotaExceeded]] = {}
+        self.loads = 0
+        self.unloads = 0
+
+        self.register(TRAVEL_AGENT)
+
+    def register(self, agent: AgentDefinition):
+        """Add or replace an agent definition, dropping any stale loaded state"""
+        self.definitions[agent.agent_id] = agent
+        self._quota_failures.pop(agent.agent_id, None)
+        runtime = self.runtimes.get(agent.agent_id)
+        if runtime and runtime.in_flight == 0:
+            self._unload(agent.agent_id)
+
+    def load_from_file(self, path: str):
+        """Load agent definitions from a JSON file containing a list of agents"""
+        with open(path) as f:
+            for agent_data in json.load(f):
+                self.register(AgentDefinition(**agent_data))
+
+    async def load_from_mongo(self, db):
+        """Load agent definitions from the agents collection"""
+        async for agent_data in db.agents.find():
+            agent_data.pop('_id', None)
+            self.register(AgentDefinition(**agent_data))
+
+    async def load_definitions(self, db=None):
+        """Load agents from AGENTS_CONFIG_PATH and, with AGENTS_SOURCE=mongo, from Mongo"""
+        config_path = os.getenv('AGENTS_CONFIG_PATH')
+        if config_path:
+            self.load_from_file(config_path)
+        if db is not None and os.getenv('AGENTS_SOURCE', 'config') == 'mongo':
+            await self.load_from_mongo(db)
+        logger.info(f"Registered {len(self.definitions)} agents")
+
+    async def get_runtime(self, agent_id: Optional[str] = None) -> AgentRuntime:
+        """Get a loaded agent runtime without reserving a concurrency slot (for read-only content access)"""
+        runtime = await self._load(agent_id or DEFAULT_AGENT_ID)
+        self._evict()
+        return runtime
+
+    async def acquire(self, agent_id: Optional[str] = None) -> AgentRuntime:
+        """Get a loaded agent runtime and reserve one of its concurrency slots"""
+        runtime = await self._load(agent_id or DEFAULT_AGENT_ID)
+        agent = runtime.agent
+        if runtime.in_flight >= agent.max_concurrency:
+            raise AgentBusy(agent.agent_id, agent.max_concurrency)
+
+        runtime.in_flight += 1
+        self._evict()
+        return runtime
+
+    async def _load(self, agent_id: str) -> AgentRuntime:
+        """Get the runtime for an agent, loading it on first use"""
+        agent = self.definitions.get(agent_id)
+        if not agent:
+            raise AgentNotFound(agent_id)
+
+        runtime = self.runtimes.get(agent_id)
+        if runtime is None:
+            failure = self._quota_failures.get(agent_id)
+            if failure and time.monotonic() < failure[0]:
+                raise failure[1]
+
+            # Concurrent first requests share one load instead of each building a snapshot
+            loading = self._loading.get(agent_id)
+            if loading is None:
+                loading = asyncio.ensure_future(self._build_runtime(agent))
+                self._loading[agent_id] = loading
+                loading.add_done_callback(lambda _: self._loading.pop(agent_id, None))
+            # Shielded so a cancelled request doesn't cancel the load for everyone else
+            runtime = await asyncio.shield(loading)
+        self.runtimes.move_to_end(agent_id)
+        runtime.last_used = time.monotonic()
+        return runtime
+
+    async def _build_runtime(self, agent: AgentDefinition) -> AgentRuntime:
+        runtime = AgentRuntime(agent)
+        try:
+            await runtime.load()
+        except AgentQuotaExceeded as e:
+            self._quota_failures[agent.agent_id] = (time.monotonic() + self.quota_retry_seconds, e)
+            raise
+        self.runtimes[agent.agent_id] = runtime
+        self.loads += 1
+        return runtime
+
+    def release(self, runtime: AgentRuntime):
+        """Return a concurrency slot taken by acquire"""
+        runtime.in_flight -= 1
+        runtime.last_used = time.monotonic()
+
+    def _evict(self):
+        """Unload idle agents, then least recently used ones while over the count or memory budget"""
+        now = time.monotonic()
+        for agent_id, runtime in list(self.runtimes.items()):
+            if runtime.in_flight == 0 and now - runtime.last_used > self.idle_seconds:
+                self._unload(agent_id)
+
+        for agent_id, runtime in list(self.runtimes.items()):
+            if len(self.runtimes) <= self.max_loaded and self._memory_bytes() <= self.memory_budget_bytes:
+                break
+            if runtime.in_flight == 0:
+                self._unload(agent_id)
+
+    def _unload(self, agent_id: str):
+        del self.runtimes[agent_id]
+        self.unloads += 1
+
+    def _memory_bytes(self) -> int:
+        return sum(runtime.memory_bytes for runtime in self.runtimes.values())
+
+    def list_agents(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                'id': agent.agent_id,
+                'name': agent.name,
+                'providers': agent.provider_policy.allowed_providers,
+                'loaded': agent.agent_id in self.runtimes
+            }
+            for agent in self.definitions.values()
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'registered': len(self.definitions),
+            'loaded': len(self.runtimes),
+            'loads': self.loads,
+            'unloads': self.unloads,
+            'memory_mb': round(self._memory_bytes() / (1024 * 1024), 3),
+            'in_flight': {agent_id: runtime.in_flight for agent_id, runtime in self.runtimes.items() if runtime.in_flight}
+        }
@@ -6,20 +6,37 @@ import asyncio
 from datetime import datetime, timedelta
 
 class ContentstackService:
-    def __init__(self):
+    def __init__(self, stack_config: Optional[Dict[str, Any]] = None):
         # Using sample Contentstack-compatible data structure for demo
         # In production, these would be real API credentials
-        self.api_key = os.getenv('CONTENTSTACK_API_KEY', 'demo_api_key')
-        self.access_token = os.getenv('CONTENTSTACK_ACCESS_TOKEN', 'demo_access_token') 
-        self.environment = os.getenv('CONTENTSTACK_ENVIRONMENT', 'production')
+        stack_config = stack_config or {}
+        self.api_key = stack_config.get('api_key') or os.getenv('CONTENTSTACK_API_KEY', 'demo_api_key')
+        self.access_token = stack_config.get('access_token') or os.getenv('CONTENTSTACK_ACCESS_TOKEN', 'demo_access_token') 
+        self.environment = stack_config.get('environment') or os.getenv('CONTENTSTACK_ENVIRONMENT', 'production')
         self.base_url = "https://cdn.contentstack.io/v3/content_types"
+        # Content type UIDs in this stack for the tour and destination models
+        self.content_types = stack_config.get('content_types') or {'tour': 'tour', 'destination': 'destination'}
+        # Fetch entries from the Delivery API instead of sample data
+        self.live = bool(stack_config.get('live', False))
         
         # Cache for demo purposes
         self._cache = {}
         self._cache_ttl = {}
         
+        # Precomputed lowercase search fields, built lazily on first search
+        self._search_index = None
+        
         # Initialize with sample data that matches Contentstack format
-        self._init_sample_data()
+        if 'sample_data' in stack_config:
+            self._load_sample_data(stack_config['sample_data'])
+        else:
+            self._init_sample_data()
+    
+    def _load_sample_data(self, sample_data: Dict[str, Any]):
+        """Initialize with entries supplied by an agent's stack configuration"""
+        self.sample_tours = list(sample_data.get('tours', []))
+        self.sample_destinations = list(sample_data.get('destinations', []))
+        self.tours_by_uid = {tour['uid']: tour for tour in self.sample_tours}
     
     def _init_sample_data(self):
         """Initialize with realistic travel data matching Contentstack structure"""
@@ -121,6 +138,9 @@ class ContentstackService:
                 "created_at": "2024-01-01T00:00:00Z"
             }
         ]
+        
+        # UID index for constant-time tour lookups
+        self.tours_by_uid = {tour['uid']: tour for tour in self.sample_tours}
 
     async def get_tours(self, filters: Optional[Dict] = None) -> List[Dict[str, Any]]:
         """Get tours from Contentstack (simulated with sample data)"""
@@ -130,14 +150,8 @@ class ContentstackService:
         if self._is_cached_valid(cache_key):
             return self._cache[cache_key]
         
-        # In production, this would be:
-        # async with httpx.AsyncClient() as client:
-        #     response = await client.get(f"{self.base_url}/tour/entries", 
-        #         headers={"api_key": self.api_key, "access_token": self.access_token})
-        #     return response.json()
-        
-        # For demo, return sample data with optional filtering
-        tours = self.sample_tours.copy()
+        # Live stacks fetch from Contentstack; otherwise use sample data
+        tours = await self._load_entries('tour')
         
         if filters:
             if 'location' in filters:
@@ -157,8 +171,10 @@ class ContentstackService:
     
     async def get_tour_by_uid(self, uid: str) -> Optional[Dict[str, Any]]:
         """Get specific tour by UID"""
-        tours = await self.get_tours()
-        return next((tour for tour in tours if tour['uid'] == uid), None)
+        if self.live:
+            # Refreshes the UID index when the cached entries have expired
+            await self._load_entries('tour')
+        return self.tours_by_uid.get(uid)
     
     async def get_destinations(self) -> List[Dict[str, Any]]:
         """Get destinations from Contentstack"""
@@ -167,8 +183,7 @@ class ContentstackService:
         if self._is_cached_valid(cache_key):
             return self._cache[cache_key]
         
-        # For demo, return sample destinations
-        destinations = self.sample_destinations.copy()
+        destinations = await self._load_entries('destination')
         
         # Cache the result
         self._cache[cache_key] = destinations
@@ -176,28 +191,80 @@ class ContentstackService:
         
         return destinations
     
+    async def _load_entries(self, content_type: str) -> List[Dict[str, Any]]:
+        """Get all entries of a content type ('tour' or 'destination')"""
+        if not self.live:
+            sample = self.sample_tours if content_type == 'tour' else self.sample_destinations
+            return sample.copy()
+        
+        cache_key = f"entries_{content_type}"
+        if self._is_cached_valid(cache_key):
+            return list(self._cache[cache_key])
+        
+        entries = await self._fetch_entries(content_type)
+        self._cache[cache_key] = entries
+        self._cache_ttl[cache_key] = datetime.utcnow() + timedelta(minutes=15)
+        
+        # Fresh entries invalidate the UID and search indexes
+        if content_type == 'tour':
+            self.tours_by_uid = {tour['uid']: tour for tour in entries}
+        self._search_index = None
+        
+        return list(entries)
+    
+    async def _fetch_entries(self, content_type: str) -> List[Dict[str, Any]]:
+        """Fetch published entries from the Delivery API, using this stack's content type UID"""
+        async with httpx.AsyncClient() as client:
+            response = await client.get(
+                f"{self.base_url}/{self.content_types[content_type]}/entries",
+                headers={"api_key": self.api_key, "access_token": self.access_token},
+                params={"environment": self.environment, "locale": "en-us"}
+            )
+            response.raise_for_status()
+            return response.json().get('entries', [])
+    
+    async def build_snapshot(self) -> int:
+        """Load the content snapshot and search index, returning its approximate size in bytes"""
+        tours = await self.get_tours()
+        destinations = await self.get_destinations()
+        self._get_search_index(tours, destinations)
+        return len(json.dumps(tours)) + len(json.dumps(destinations))
+    
+    def _get_search_index(self, tours: List[Dict[str, Any]], destinations: List[Dict[str, Any]]):
+        """Get (entry, lowercase fields) pairs for tours and destinations"""
+        if self._search_index is None:
+            self._search_index = {
+                'tours': [
+                    (tour, [tour['title'].lower(), tour['description'].lower(), tour['location'].lower()]
+                        + [highlight.lower() for highlight in tour['highlights']])
+                    for tour in tours
+                ],
+                'destinations': [
+                    (dest, [dest['title'].lower(), dest['description'].lower()])
+                    for dest in destinations
+                ]
+            }
+        return self._search_index
+    
     async def search_content(self, query: str) -> Dict[str, Any]:
         """Search across tours and destinations"""
         query_lower = query.lower()
         
         tours = await self.get_tours()
         destinations = await self.get_destinations()
+        search_index = self._get_search_index(tours, destinations)
         
         # Search tours
-        matching_tours = []
-        for tour in tours:
-            if (query_lower in tour['title'].lower() or 
-                query_lower in tour['description'].lower() or
-                query_lower in tour['location'].lower() or
-                any(query_lower in highlight.lower() for highlight in tour['highlights'])):
-                matching_tours.append(tour)
+        matching_tours = [
+            tour for tour, fields in search_index['tours']
+            if any(query_lower in field for field in fields)
+        ]
         
         # Search destinations  
-        matching_destinations = []
-        for dest in destinations:
-            if (query_lower in dest['title'].lower() or 
-                query_lower in dest['description'].lower()):
-                matching_destinations.append(dest)
+        matching_destinations = [
+            dest for dest, fields in search_index['destinations']
+            if any(query_lower in field for field in fields)
+        ]
         
         return {
             "tours": matching_tours,
@@ -0,0 +1,75 @@
+import os
+import math
+import time
+import asyncio
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar('T')
+
+# Default and maximum end-to-end budget for a chat request, in seconds
+DEFAULT_DEADLINE_SECONDS = float(os.getenv('CHAT_REQUEST_DEADLINE_SECONDS', '30'))
+MAX_DEADLINE_SECONDS = float(os.getenv('CHAT_MAX_REQUEST_DEADLINE_SECONDS', '120'))
+
+# Below this remaining budget, stages should degrade (smaller context, faster provider)
+LOW_BUDGET_SECONDS = float(os.getenv('CHAT_LOW_BUDGET_SECONDS', '8'))
+
+DEADLINE_EXCEEDED_MESSAGE = "I'm sorry, that took longer than expected. Please try again."
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of its time budget"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        super().__init__(f"Request deadline exceeded during {stage}")
+
+
+class Deadline:
+    """Absolute per-request deadline, shared by every stage of the chat pipeline"""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def from_header(cls, header_value: Optional[str]) -> 'Deadline':
+        """Build a deadline from an X-Request-Deadline header (seconds), falling back to config"""
+        seconds = DEFAULT_DEADLINE_SECONDS
+        if header_value:
+            try:
+                seconds = float(header_value)
+            except ValueError:
+                pass
+        # Reject nan/inf as well as non-positive budgets
+        if not math.isfinite(seconds) or seconds <= 0:
+            seconds = DEFAULT_DEADLINE_SECONDS
+        return cls(min(seconds, MAX_DEADLINE_SECONDS))
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    @property
+    def is_low(self) -> bool:
+        """Whether the remaining budget is short enough that stages should degrade"""
+        return self.remaining() < LOW_BUDGET_SECONDS
+
+    def check(self, stage: str):
+        """Raise DeadlineExceeded if the deadline has already passed"""
+        if self.expired:
+            raise DeadlineExceeded(stage)
+
+    async def run(self, awaitable: Awaitable[T], stage: str) -> T:
+        """Await a stage within the remaining budget, cancelling it when the deadline expires"""
+        if self.expired:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded(stage)
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage)
@@ -0,0 +1,260 @@
+import re
+import time
+from typing import Dict, Any, Iterable, List, Optional, Set
+
+from services.contentstack import ContentstackService
+from services.agents import FastPathTemplates
+
+# Words that carry no meaning for a lookup
+STOPWORDS = {
+    'a', 'an', 'the', 'of', 'in', 'at', 'on', 'for', 'to', 'with', 'and', 'or',
+    'do', 'does', 'you', 'your', 'we', 'our', 'me', 'i', 'is', 'are', 'it', 's',
+    'there', 'any', 'all', 'have', 'has', 'can', 'please', 'this', 'that', 'these', 'those'
+}
+
+# Words that only ask for catalog data (lookup verbs, list nouns, price phrases)
+LOOKUP_WORDS = {
+    'what', 'which', 'show', 'list', 'find', 'give', 'see', 'get', 'where', 'go', 'offer', 'run',
+    'tour', 'tours', 'trip', 'trips', 'options', 'available',
+    'categories', 'category', 'kind', 'kinds', 'type', 'types', 'locations', 'places', 'cities',
+    'price', 'prices', 'cost', 'costs', 'how', 'much',
+    'under', 'below', 'less', 'than', 'cheaper', 'max', 'maximum', 'up', 'within'
+}
+
+PRICE_PATTERN = re.compile(
+    r'\b(?:under|below|less than|cheaper than|max(?:imum)?|up to|within)\s*\$?\s*(\d{2,6})\b'
+)
+PRICE_WORDS_PATTERN = re.compile(r'\b(?:price|cost|how much)\b')
+LIST_WORDS_PATTERN = re.compile(r'\b(?:tours?|trips?|show|list|available|options)\b')
+CATEGORIES_PATTERN = re.compile(r'\b(?:categories|category|kinds? of tours?|types? of tours?)\b')
+LOCATIONS_PATTERN = re.compile(r'\b(?:locations|places|cities|where do you (?:go|offer|have))\b')
+
+MAX_LOOKUP_WORDS = 12
+
+
+class FastPathService:
+    """Answers plain catalog lookups from Contentstack data without an LLM call"""
+
+    def __init__(self):
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.hits_by_intent: Dict[str, int] = {}
+        self.fast_path_seconds = 0.0
+        self.llm_seconds = 0.0
+        self.llm_requests = 0
+
+    async def try_answer(
+        self,
+        query: str,
+        contentstack_service: ContentstackService,
+        templates: Optional[FastPathTemplates]
+    ) -> Optional[Dict[str, Any]]:
+        """Return a templated answer for a catalog lookup, or None to fall through to the LLM.
+        
+        Agents without fast-path templates always fall through and are not counted.
+        """
+        if templates is None:
+            return None
+        
+        started = time.perf_counter()
+        answer = await self._answer(query, contentstack_service, templates)
+        elapsed = time.perf_counter() - started
+
+        if answer is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.hits_by_intent[answer['intent']] = self.hits_by_intent.get(answer['intent'], 0) + 1
+        self.fast_path_seconds += elapsed
+        return answer
+
+    async def _answer(
+        self,
+        query: str,
+        contentstack_service: ContentstackService,
+        templates: FastPathTemplates
+    ) -> Optional[Dict[str, Any]]:
+        query_lower = query.lower().strip().rstrip('?!.')
+        words = re.findall(r"[a-z0-9]+", query_lower)
+
+        if not words or len(words) > MAX_LOOKUP_WORDS:
+            return None
+
+        tours = await contentstack_service.get_tours()
+        if not tours:
+            return None
+
+        # Any word left over after lookup and filter terms means the query asks something else
+        if not self.is_pure_lookup(query_lower, words, tours):
+            return None
+
+        # Naming several tours, cities or categories ("Rome or Venice") asks for more than
+        # one lookup, which the templates can't answer completely
+        filters = self.extract_filters(query_lower, tours)
+        if filters is None or len(self._named(query_lower, (tour['title'] for tour in tours))) > 1:
+            return None
+
+        if CATEGORIES_PATTERN.search(query_lower):
+            return self._render_categories(tours, templates)
+
+        if LOCATIONS_PATTERN.search(query_lower):
+            return self._render_locations(tours, templates)
+
+        # Price of a specific tour
+        if PRICE_WORDS_PATTERN.search(query_lower):
+            tour = self._match_tour(query_lower, tours, filters)
+            if tour:
+                return self._render_price(tour, templates)
+
+        if filters and LIST_WORDS_PATTERN.search(query_lower):
+            matching_tours = await contentstack_service.get_tours(filters)
+            return self._render_tour_list(matching_tours, filters, templates)
+
+        return None
+
+    def is_pure_lookup(self, query_lower: str, words: List[str], tours: List[Dict[str, Any]]) -> bool:
+        """Whether every non-stopword is a lookup word, a catalog filter term or part of a price phrase"""
+        filter_terms = set()
+        for tour in tours:
+            for field in (tour['title'], tour['location'], tour['category']):
+                filter_terms.update(re.findall(r"[a-z0-9]+", field.lower()))
+
+        price_match = PRICE_PATTERN.search(query_lower)
+        price_terms = {price_match.group(1)} if price_match else set()
+
+        return all(
+            word in STOPWORDS or word in LOOKUP_WORDS or word in filter_terms or word in price_terms
+            for word in words
+        )
+
+    def extract_filters(self, query_lower: str, tours: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Map a query onto the get_tours filters (location, category, max_price).
+        
+        Returns None when the query names more than one city or category.
+        """
+        filters = {}
+
+        price_match = PRICE_PATTERN.search(query_lower)
+        if price_match:
+            filters['max_price'] = int(price_match.group(1))
+
+        cities = self._named(query_lower, (tour['location'].split(',')[0] for tour in tours))
+        categories = self._named(query_lower, (tour['category'] for tour in tours))
+        if len(cities) > 1 or len(categories) > 1:
+            return None
+
+        if cities:
+            filters['location'] = cities.pop()
+        if categories:
+            filters['category'] = categories.pop()
+
+        return filters
+
+    def _named(self, query_lower: str, values: Iterable[str]) -> Set[str]:
+        """Distinct catalog values (lowercased) that appear in the query as whole words"""
+        return {
+            value.lower() for value in values
+            if re.search(rf'\b{re.escape(value.lower())}\b', query_lower)
+        }
+
+    def _match_tour(
+        self,
+        query_lower: str,
+        tours: List[Dict[str, Any]],
+        filters: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Find the tour named in the query via its title or city"""
+        for tour in tours:
+            if tour['title'].lower() in query_lower:
+                return tour
+
+        candidates = [
+            tour for tour in tours
+            if 'location' in filters and tour['location'].split(',')[0].lower() == filters['location']
+        ]
+        # Only answer when the reference is unambiguous
+        if len(candidates) == 1:
+            return candidates[0]
+        return None
+
+    def _render_price(self, tour: Dict[str, Any], templates: FastPathTemplates) -> Dict[str, Any]:
+        content = templates.price.format(
+            title=tour['title'],
+            price=tour['price'],
+            duration=tour['duration'],
+            location=tour['location'],
+            highlights=', '.join(tour['highlights'][:3]),
+            rating=tour.get('rating', 'N/A')
+        )
+        return {'intent': 'price', 'content': content, 'related_content': [tour['uid']]}
+
+    def _render_tour_list(
+        self,
+        tours: List[Dict[str, Any]],
+        filters: Dict[str, Any],
+        templates: FastPathTemplates
+    ) -> Dict[str, Any]:
+        criteria = []
+        if 'category' in filters:
+            criteria.append(templates.category_criteria.format(category=filters['category'].title()))
+        if 'location' in filters:
+            criteria.append(templates.location_criteria.format(location=filters['location'].title()))
+        if 'max_price' in filters:
+            criteria.append(templates.price_criteria.format(max_price=filters['max_price']))
+        criteria_str = ' '.join(criteria)
+
+        if not tours:
+            content = templates.no_results.format(criteria=criteria_str)
+            return {'intent': 'tour_filter', 'content': content, 'related_content': []}
+
+        lines = [templates.tour_list.format(criteria=criteria_str)]
+        for tour in tours[:5]:
+            lines.append(templates.tour_list_item.format(
+                title=tour['title'],
+                price=tour['price'],
+                duration=tour['duration'],
+                location=tour['location']
+            ))
+
+        return {
+            'intent': 'tour_filter',
+            'content': '\n'.join(lines),
+            'related_content': [tour['uid'] for tour in tours[:3]]
+        }
+
+    def _render_categories(self, tours: List[Dict[str, Any]], templates: FastPathTemplates) -> Dict[str, Any]:
+        categories = sorted(set(tour['category'] for tour in tours))
+        items = '\n'.join(templates.list_item.format(value=c) for c in categories)
+        return {'intent': 'categories', 'content': templates.categories.format(items=items), 'related_content': []}
+
+    def _render_locations(self, tours: List[Dict[str, Any]], templates: FastPathTemplates) -> Dict[str, Any]:
+        locations = sorted(set(tour['location'] for tour in tours))
+        items = '\n'.join(templates.list_item.format(value=l) for l in locations)
+        return {'intent': 'locations', 'content': templates.locations.format(items=items), 'related_content': []}
+
+    def record_llm_latency(self, seconds: float):
+        """Record the latency of a request served by the LLM, used to estimate savings"""
+        self.llm_seconds += seconds
+        self.llm_requests += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get fast-path hit rate and estimated latency saved"""
+        total = self.hits + self.misses
+        avg_llm_ms = (self.llm_seconds / self.llm_requests * 1000) if self.llm_requests else None
+        avg_fast_ms = (self.fast_path_seconds / self.hits * 1000) if self.hits else None
+
+        latency_saved_ms = None
+        if avg_llm_ms is not None and avg_fast_ms is not None:
+            latency_saved_ms = round(max(avg_llm_ms - avg_fast_ms, 0) * self.hits, 2)
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'hits_by_intent': dict(self.hits_by_intent),
+            'avg_fast_path_ms': round(avg_fast_ms, 3) if avg_fast_ms is not None else None,
+            'avg_llm_ms': round(avg_llm_ms, 2) if avg_llm_ms is not None else None,
+            'estimated_latency_saved_ms': latency_saved_ms
+        }
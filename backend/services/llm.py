@@ -8,6 +8,9 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+from services.deadline import Deadline, DeadlineExceeded, DEADLINE_EXCEEDED_MESSAGE
+from services.agents import AgentDefinition, TRAVEL_SYSTEM_MESSAGE
+
 try:
     from emergentintegrations.llm.chat import LlmChat, UserMessage
 except ImportError:
@@ -29,46 +32,57 @@ class LLMService:
         
         self.default_provider = 'groq'
         
+        # Provider to fall back to when a request is running short on time
+        self.fastest_provider = 'groq'
+        
     def get_travel_system_message(self) -> str:
         """Get system message optimized for travel assistant"""
-        return """You are a professional Travel Assistant specializing in Italian tourism. You help users discover amazing tours, destinations, and travel experiences.
-
-GUIDELINES:
-- Be enthusiastic and knowledgeable about travel
-- Provide specific, actionable information
-- Include prices, durations, and key highlights when available
-- Suggest related tours and destinations
-- Use emojis sparingly for visual appeal
-- Format responses with clear structure (use **bold** for important info)
-- If you don't have specific information, acknowledge it and provide general helpful advice
+        return TRAVEL_SYSTEM_MESSAGE
 
-CONTEXT: You have access to real-time tour and destination data from our content management system. Use this information to provide accurate, up-to-date recommendations."""
+    def resolve_provider(self, provider: str = None, agent: Optional[AgentDefinition] = None) -> str:
+        """Pick the provider to use, honouring the agent's provider policy"""
+        default_provider = agent.provider_policy.default_provider if agent else self.default_provider
+        if default_provider not in self.providers:
+            default_provider = self.default_provider
+        
+        if not provider or provider not in self.providers:
+            return default_provider
+        if agent and provider not in agent.provider_policy.allowed_providers:
+            return default_provider
+        return provider
 
-    async def create_chat_session(self, session_id: str, provider: str = None) -> LlmChat:
+    async def create_chat_session(
+        self,
+        session_id: str,
+        provider: str = None,
+        agent: Optional[AgentDefinition] = None
+    ) -> LlmChat:
         """Create a new chat session with specified provider"""
-        if not provider:
-            provider = self.default_provider
-            
-        if provider not in self.providers:
-            provider = self.default_provider
-            
+        provider = self.resolve_provider(provider, agent)
         config = self.providers[provider]
         
+        system_message = agent.system_message if agent else self.get_travel_system_message()
+        
         chat = LlmChat(
             api_key=self.api_key,
             session_id=session_id,
-            system_message=self.get_travel_system_message()
+            system_message=system_message
         ).with_model(config['provider'], config['model'])
         
         return chat
     
-    def format_content_context(self, content_data: Dict[str, Any]) -> str:
+    def format_content_context(
+        self,
+        content_data: Dict[str, Any],
+        max_tours: int = 5,
+        include_destinations: bool = True
+    ) -> str:
         """Format Contentstack data for LLM context"""
         context_parts = []
         
         if 'tours' in content_data and content_data['tours']:
             context_parts.append("AVAILABLE TOURS:")
-            for tour in content_data['tours'][:5]:  # Limit to prevent token overflow
+            for tour in content_data['tours'][:max_tours]:  # Limit to prevent token overflow
                 context_parts.append(f"""
 • **{tour['title']}** - {tour['price']} ({tour['duration']})
   Location: {tour['location']}
@@ -76,7 +90,7 @@ CONTEXT: You have access to real-time tour and destination data from our content
   Highlights: {', '.join(tour['highlights'][:3])}
   Rating: {tour.get('rating', 'N/A')}/5""")
         
-        if 'destinations' in content_data and content_data['destinations']:
+        if include_destinations and 'destinations' in content_data and content_data['destinations']:
             context_parts.append("\nAVAILABLE DESTINATIONS:")
             for dest in content_data['destinations']:
                 context_parts.append(f"""
@@ -90,35 +104,61 @@ CONTEXT: You have access to real-time tour and destination data from our content
         query: str, 
         session_id: str, 
         provider: str = None,
-        content_context: Optional[Dict[str, Any]] = None
+        content_context: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+        agent: Optional[AgentDefinition] = None,
+        chat: Optional[LlmChat] = None,
+        context_str: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Get a complete chat response"""
+        """Get a complete chat response, within the request deadline if one is given.
+        
+        A prefetched chat session and rendered context block may be passed in to skip building them.
+        """
         try:
-            chat = await self.create_chat_session(session_id, provider)
+            # Degrade to a smaller prompt and the fastest provider when time is short
+            degraded = deadline is not None and deadline.is_low
+            if degraded:
+                provider = agent.provider_policy.fastest_provider if agent else self.fastest_provider
+            provider = self.resolve_provider(provider, agent)
+            
+            # A prefetched session is bound to the non-degraded provider
+            if chat is None or degraded:
+                chat = await self.create_chat_session(session_id, provider, agent)
             
             # Build enhanced query with content context
+            if deadline:
+                deadline.check('prompt build')
             enhanced_query = query
             if content_context:
-                context_str = self.format_content_context(content_context)
+                if degraded:
+                    context_str = self.format_content_context(content_context, max_tours=2, include_destinations=False)
+                elif context_str is None:
+                    context_str = self.format_content_context(content_context)
                 enhanced_query = f"{context_str}\n\nUSER QUERY: {query}\n\nPlease provide a helpful response based on the available tours and destinations above."
             
             user_message = UserMessage(text=enhanced_query)
-            response = await chat.send_message(user_message)
+            if deadline:
+                response = await deadline.run(chat.send_message(user_message), 'provider call')
+            else:
+                response = await chat.send_message(user_message)
             
             return {
                 'success': True,
                 'content': response,
                 'provider': provider or self.default_provider,
                 'timestamp': datetime.utcnow().isoformat(),
-                'session_id': session_id
+                'session_id': session_id,
+                'degraded': degraded
             }
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e),
                 'content': "I apologize, but I'm experiencing technical difficulties. Please try again in a moment.",
-                'provider': provider or self.default_provider,
+                'provider': self.resolve_provider(provider, agent),
                 'timestamp': datetime.utcnow().isoformat(),
                 'session_id': session_id
             }
@@ -128,12 +168,18 @@ CONTEXT: You have access to real-time tour and destination data from our content
         query: str,
         session_id: str, 
         provider: str = None,
-        content_context: Optional[Dict[str, Any]] = None
+        content_context: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+        agent: Optional[AgentDefinition] = None,
+        chat: Optional[LlmChat] = None,
+        context_str: Optional[str] = None
     ) -> AsyncGenerator[str, None]:
         """Stream chat response word by word (simulated for now)"""
         try:
             # Get the complete response first
-            response_data = await self.get_chat_response(query, session_id, provider, content_context)
+            response_data = await self.get_chat_response(
+                query, session_id, provider, content_context, deadline, agent, chat, context_str
+            )
             
             if not response_data['success']:
                 yield f"data: {json.dumps(response_data)}\n\n"
@@ -145,6 +191,17 @@ CONTEXT: You have access to real-time tour and destination data from our content
             # Simulate streaming by yielding words with delays
             accumulated_content = ""
             for i, word in enumerate(words):
+                # Out of time: flush the rest of the response in one final chunk
+                if deadline and deadline.expired:
+                    chunk_data = {
+                        'content': content,
+                        'is_complete': True,
+                        'provider': response_data['provider'],
+                        'timestamp': response_data['timestamp']
+                    }
+                    yield f"data: {json.dumps(chunk_data)}\n\n"
+                    return
+                
                 accumulated_content += (" " if i > 0 else "") + word
                 
                 chunk_data = {
@@ -157,23 +214,37 @@ CONTEXT: You have access to real-time tour and destination data from our content
                 yield f"data: {json.dumps(chunk_data)}\n\n"
                 
                 # Different speeds for different providers
-                if provider == 'groq':
+                if response_data['provider'] == 'groq':
                     await asyncio.sleep(0.05)  # Fast
-                elif provider == 'openai': 
+                elif response_data['provider'] == 'openai': 
                     await asyncio.sleep(0.08)  # Medium
                 else:  # Claude
                     await asyncio.sleep(0.1)   # Slower
                     
+        except DeadlineExceeded as e:
+            yield f"data: {json.dumps(self.deadline_exceeded_data(e, self.resolve_provider(provider, agent)))}\n\n"
         except Exception as e:
             error_data = {
                 'error': str(e),
                 'content': "I apologize, but I'm experiencing technical difficulties. Please try again in a moment.",
                 'is_complete': True,
-                'provider': provider or self.default_provider,
+                'provider': self.resolve_provider(provider, agent),
                 'timestamp': datetime.utcnow().isoformat()
             }
             yield f"data: {json.dumps(error_data)}\n\n"
     
+    def deadline_exceeded_data(self, error: DeadlineExceeded, provider: str) -> Dict[str, Any]:
+        """Final stream chunk sent when a request runs out of time"""
+        return {
+            'error': str(error),
+            'content': DEADLINE_EXCEEDED_MESSAGE,
+            'is_complete': True,
+            'deadline_exceeded': True,
+            'stage': error.stage,
+            'provider': provider,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+    
     def get_available_providers(self) -> List[Dict[str, str]]:
         """Get list of available LLM providers"""
         return [
@@ -0,0 +1,159 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from services.agents import AgentRuntime
+from services.llm import LLMService
+
+PREFETCH_TTL_SECONDS = float(os.getenv('PREFETCH_TTL_SECONDS', '30'))
+PREFETCH_MAX_ENTRIES = int(os.getenv('PREFETCH_MAX_ENTRIES', '1000'))
+# Prefetches don't use agent concurrency slots, so they have their own (smaller) limit
+PREFETCH_MAX_CONCURRENT = int(os.getenv('PREFETCH_MAX_CONCURRENT', '10'))
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r'\s+', ' ', query.strip().lower())
+
+
+class PrefetchService:
+    """Short-lived cache of search results, rendered context and chat sessions warmed while the user types"""
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        ttl: float = PREFETCH_TTL_SECONDS,
+        max_entries: int = PREFETCH_MAX_ENTRIES,
+        max_concurrent: int = PREFETCH_MAX_CONCURRENT
+    ):
+        self.llm_service = llm_service
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+
+        self._content: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._sessions: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+
+        # Metrics
+        self.prefetches = 0
+        self.skipped = 0
+        self.content_hits = 0
+        self.content_misses = 0
+        self.session_hits = 0
+        self.session_misses = 0
+        self.saved_seconds = 0.0
+        self.ttft_hit_seconds = 0.0
+        self.ttft_hit_count = 0
+        self.ttft_miss_seconds = 0.0
+        self.ttft_miss_count = 0
+
+    async def prefetch(self, runtime: AgentRuntime, query: str, session_id: Optional[str], provider: str = None) -> bool:
+        """Precompute search results, the context block and a chat session for a partial query.
+        
+        Returns False without doing any work when the prefetch concurrency limit is reached.
+        """
+        if self.in_flight >= self.max_concurrent:
+            self.skipped += 1
+            return False
+        
+        self.in_flight += 1
+        try:
+            await self._prefetch(runtime, query, session_id, provider)
+        finally:
+            self.in_flight -= 1
+        return True
+    
+    async def _prefetch(self, runtime: AgentRuntime, query: str, session_id: Optional[str], provider: str = None):
+        agent = runtime.agent
+        self.prefetches += 1
+
+        started = time.perf_counter()
+        content_context = await runtime.contentstack_service.search_content(query)
+        context_str = self.llm_service.format_content_context(content_context)
+        content_seconds = time.perf_counter() - started
+        self._put(self._content, (agent.agent_id, normalize_query(query)), {
+            'content_context': content_context,
+            'context_str': context_str,
+            'build_seconds': content_seconds
+        })
+
+        # Sessions can only be matched to the follow-up request by session ID
+        if not session_id:
+            return
+        provider = self.llm_service.resolve_provider(provider, agent)
+        session_key = (agent.agent_id, session_id, provider)
+        if self._get(self._sessions, session_key) is None:
+            started = time.perf_counter()
+            chat = await self.llm_service.create_chat_session(session_id, provider, agent)
+            self._put(self._sessions, session_key, {
+                'chat': chat,
+                'build_seconds': time.perf_counter() - started
+            })
+
+    def take_content(self, agent_id: str, query: str) -> Optional[Dict[str, Any]]:
+        """Get prefetched search results and context for the exact (normalized) query"""
+        entry = self._get(self._content, (agent_id, normalize_query(query)))
+        if entry is None:
+            self.content_misses += 1
+            return None
+        self.content_hits += 1
+        self.saved_seconds += entry['build_seconds']
+        return entry
+
+    def take_session(self, agent_id: str, session_id: str, provider: str):
+        """Get and consume a prefetched chat session, so each session object serves one request"""
+        key = (agent_id, session_id, provider)
+        entry = self._get(self._sessions, key)
+        if entry is None:
+            self.session_misses += 1
+            return None
+        del self._sessions[key]
+        self.session_hits += 1
+        self.saved_seconds += entry['build_seconds']
+        return entry['chat']
+
+    def record_time_to_first_token(self, seconds: float, prefetch_hit: bool):
+        if prefetch_hit:
+            self.ttft_hit_seconds += seconds
+            self.ttft_hit_count += 1
+        else:
+            self.ttft_miss_seconds += seconds
+            self.ttft_miss_count += 1
+
+    def _put(self, cache: OrderedDict, key: Tuple, entry: Dict[str, Any]):
+        entry['expires_at'] = time.monotonic() + self.ttl
+        cache[key] = entry
+        cache.move_to_end(key)
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+
+    def _get(self, cache: OrderedDict, key: Tuple) -> Optional[Dict[str, Any]]:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() > entry['expires_at']:
+            del cache[key]
+            return None
+        return entry
+
+    def get_metrics(self) -> Dict[str, Any]:
+        content_total = self.content_hits + self.content_misses
+        session_total = self.session_hits + self.session_misses
+        avg_ttft_hit_ms = self.ttft_hit_seconds / self.ttft_hit_count * 1000 if self.ttft_hit_count else None
+        avg_ttft_miss_ms = self.ttft_miss_seconds / self.ttft_miss_count * 1000 if self.ttft_miss_count else None
+        return {
+            'prefetches': self.prefetches,
+            'skipped': self.skipped,
+            'in_flight': self.in_flight,
+            'content_hit_rate': round(self.content_hits / content_total, 4) if content_total else 0.0,
+            'session_hit_rate': round(self.session_hits / session_total, 4) if session_total else 0.0,
+            'content_hits': self.content_hits,
+            'session_hits': self.session_hits,
+            'saved_ms': round(self.saved_seconds * 1000, 3),
+            'avg_ttft_hit_ms': round(avg_ttft_hit_ms, 2) if avg_ttft_hit_ms is not None else None,
+            'avg_ttft_miss_ms': round(avg_ttft_miss_ms, 2) if avg_ttft_miss_ms is not None else None,
+            'cached_content': len(self._content),
+            'cached_sessions': len(self._sessions)
+        }
@@ -0,0 +1,249 @@
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+
+# Profiling is opt-in; with PROFILING_ENABLED unset the middleware does nothing
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_INTERVAL_SECONDS = float(os.getenv('PROFILING_INTERVAL_SECONDS', '0.005'))
+MAX_CONCURRENT_PROFILES = int(os.getenv('PROFILING_MAX_CONCURRENT', '2'))
+MAX_STORED_PROFILES = 50
+MAX_PROFILE_SECONDS = 60
+
+
+def collapse_stack(frame) -> str:
+    """Render a frame chain as a collapsed stack line (root first, ';'-separated)"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+
+def format_collapsed(stacks: Dict[str, int]) -> str:
+    """Format stack counts in the collapsed format read by flamegraph.pl and speedscope"""
+    return '\n'.join(
+        f"{stack} {count}"
+        for stack, count in sorted(stacks.items(), key=lambda item: item[1], reverse=True)
+    )
+
+
+class SamplingProfiler:
+    """Statistical profiler that samples one thread's stack from a background thread"""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = PROFILING_INTERVAL_SECONDS):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.started_at = None
+        self.duration = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict[str, int]:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self.duration = time.monotonic() - self.started_at
+        return self.stacks
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = collapse_stack(frame)
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'samples': self.samples,
+            'interval_ms': self.interval * 1000,
+            'duration_ms': round(self.duration * 1000, 2),
+            'collapsed': format_collapsed(self.stacks)
+        }
+
+
+class LoopLagMonitor:
+    """Measures asyncio event-loop lag as the overshoot of a periodic sleep"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(loop.time() - expected, 0.0))
+            # Keep a bounded window of recent measurements
+            if len(self.lags) > 1000:
+                del self.lags[:500]
+
+    def get_stats(self) -> Dict[str, Any]:
+        if not self.lags:
+            return {'samples': 0, 'avg_ms': None, 'p99_ms': None, 'max_ms': None}
+        ordered = sorted(self.lags)
+        return {
+            'samples': len(ordered),
+            'avg_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+            'p99_ms': round(ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)] * 1000, 3),
+            'max_ms': round(ordered[-1] * 1000, 3)
+        }
+
+
+class ProfilingService:
+    """Per-request and on-demand worker profiling, plus a process-wide loop lag monitor"""
+
+    def __init__(self):
+        self.enabled = PROFILING_ENABLED
+        self.sample_rate = PROFILING_SAMPLE_RATE
+        self.active_profiles = 0
+        self.in_flight_requests = 0
+        # Peak number of concurrent requests seen during each running profile
+        self._peak_in_flight: Dict[str, int] = {}
+        self.profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.loop_lag_monitor = LoopLagMonitor()
+
+    def start_loop_lag_monitor(self):
+        if self.enabled:
+            self.loop_lag_monitor.start()
+
+    async def stop_loop_lag_monitor(self):
+        await self.loop_lag_monitor.stop()
+
+    def should_profile(self, header_value: Optional[str]) -> bool:
+        """Profile when enabled and either requested by header or picked by sampling"""
+        if not self.enabled or self.active_profiles >= MAX_CONCURRENT_PROFILES:
+            return False
+        if header_value and header_value.lower() in ('1', 'true', 'yes'):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start_request_profile(self) -> Tuple[str, SamplingProfiler]:
+        profile_id = uuid.uuid4().hex[:12]
+        profiler = SamplingProfiler()
+        self.active_profiles += 1
+        self._peak_in_flight[profile_id] = self.in_flight_requests
+        profiler.start()
+        return profile_id, profiler
+
+    def finish_request_profile(self, profile_id: str, profiler: SamplingProfiler, path: str):
+        profiler.stop()
+        self.active_profiles -= 1
+
+        profile = profiler.to_dict()
+        profile['id'] = profile_id
+        profile['path'] = path
+        # Samples cover the whole event-loop thread, so other requests running at the
+        # same time show up in this profile too
+        profile['peak_concurrent_requests'] = self._peak_in_flight.pop(profile_id, 1)
+        self.profiles[profile_id] = profile
+        while len(self.profiles) > MAX_STORED_PROFILES:
+            self.profiles.popitem(last=False)
+
+    def request_started(self):
+        self.in_flight_requests += 1
+        for profile_id, peak in self._peak_in_flight.items():
+            self._peak_in_flight[profile_id] = max(peak, self.in_flight_requests)
+
+    def request_finished(self):
+        self.in_flight_requests -= 1
+
+    def get_profile(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self.profiles.get(profile_id)
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        return [
+            {'id': p['id'], 'path': p['path'], 'samples': p['samples'], 'duration_ms': p['duration_ms']}
+            for p in reversed(self.profiles.values())
+        ]
+
+    async def profile_worker(self, seconds: float) -> Dict[str, Any]:
+        """Sample the event-loop thread of this worker for the given number of seconds"""
+        seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+        profiler = SamplingProfiler()
+        lag_monitor = LoopLagMonitor()
+
+        self.active_profiles += 1
+        profiler.start()
+        lag_monitor.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await lag_monitor.stop()
+            profiler.stop()
+            self.active_profiles -= 1
+
+        profile = profiler.to_dict()
+        profile['pid'] = os.getpid()
+        profile['loop_lag'] = lag_monitor.get_stats()
+        return profile
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests sent with an X-Profile header, or picked by sampling.
+
+    The profile ends when the app call returns, which covers streamed bodies and client
+    disconnects alike. Samples are taken from the whole event-loop thread, so concurrent
+    requests are included; see peak_concurrent_requests on each profile.
+    """
+
+    def __init__(self, app, profiling_service: ProfilingService):
+        self.app = app
+        self.profiling_service = profiling_service
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        service = self.profiling_service
+        service.request_started()
+        try:
+            if not service.should_profile(Headers(scope=scope).get('x-profile')):
+                await self.app(scope, receive, send)
+                return
+
+            profile_id, profiler = service.start_request_profile()
+
+            async def send_with_profile_id(message):
+                if message['type'] == 'http.response.start':
+                    MutableHeaders(scope=message).append('X-Profile-Id', profile_id)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_profile_id)
+            finally:
+                service.finish_request_profile(profile_id, profiler, scope['path'])
+        finally:
+            service.request_finished()
@@ -0,0 +1,7 @@
+from services.agents import AgentManager
+from services.task_queue import TaskQueue
+
+# Process-wide instances shared by the routers and server startup/shutdown
+agent_manager = AgentManager()
+# Post-response work (transcripts, metrics, status checks); handlers are registered in server.py
+task_queue = TaskQueue()
@@ -0,0 +1,146 @@
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+TASK_QUEUE_MAX_SIZE = int(os.getenv('TASK_QUEUE_MAX_SIZE', '10000'))
+TASK_QUEUE_WORKERS = int(os.getenv('TASK_QUEUE_WORKERS', '2'))
+TASK_QUEUE_BATCH_SIZE = int(os.getenv('TASK_QUEUE_BATCH_SIZE', '100'))
+TASK_QUEUE_MAX_RETRIES = int(os.getenv('TASK_QUEUE_MAX_RETRIES', '3'))
+TASK_QUEUE_DRAIN_SECONDS = float(os.getenv('TASK_QUEUE_DRAIN_SECONDS', '10'))
+
+BatchHandler = Callable[[List[Any]], Awaitable[None]]
+
+
+class TaskQueue:
+    """In-process queue for post-response work, processed in batches by background workers"""
+
+    def __init__(
+        self,
+        max_size: int = TASK_QUEUE_MAX_SIZE,
+        workers: int = TASK_QUEUE_WORKERS,
+        batch_size: int = TASK_QUEUE_BATCH_SIZE,
+        max_retries: int = TASK_QUEUE_MAX_RETRIES,
+        retry_backoff: float = 0.5
+    ):
+        self.max_size = max_size
+        self.worker_count = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self.handlers: Dict[str, BatchHandler] = {}
+        self._queue: "asyncio.Queue[Tuple[str, Any]]" = None
+        self._workers: List[asyncio.Task] = []
+        self.accepting = False
+        # Jobs taken off the queue whose batch is still running or retrying
+        self.in_flight = 0
+
+        # Metrics
+        self.enqueued = 0
+        self.rejected = 0
+        self.processed = 0
+        self.retries = 0
+        self.failed = 0
+        self.batches = 0
+
+    def register_handler(self, kind: str, handler: BatchHandler):
+        """Register the coroutine that processes a batch of payloads of the given kind"""
+        self.handlers[kind] = handler
+
+    def start(self):
+        """Start the worker tasks; must be called from the running event loop"""
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        self.accepting = True
+
+    def enqueue(self, kind: str, payload: Any) -> bool:
+        """Queue work without waiting. Returns False if the queue is full or not running."""
+        if not self.accepting or kind not in self.handlers:
+            self.rejected += 1
+            return False
+        try:
+            self._queue.put_nowait((kind, payload))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def drain(self, timeout: float = TASK_QUEUE_DRAIN_SECONDS):
+        """Stop accepting work, wait for queued jobs to finish, then stop the workers"""
+        if self._queue is None:
+            return
+        self.accepting = False
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Task queue drain timed out with {self.unfinished()} jobs not done "
+                f"({self._queue.qsize()} queued, {self.in_flight} in flight)"
+            )
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self):
+        while True:
+            jobs = [await self._queue.get()]
+            # Greedily pull whatever else is already waiting, up to one batch
+            while len(jobs) < self.batch_size:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            self.in_flight += len(jobs)
+            try:
+                batches: Dict[str, List[Any]] = {}
+                for kind, payload in jobs:
+                    batches.setdefault(kind, []).append(payload)
+                for kind, payloads in batches.items():
+                    await self._run_batch(kind, payloads)
+            finally:
+                self.in_flight -= len(jobs)
+                for _ in jobs:
+                    self._queue.task_done()
+
+    def unfinished(self) -> int:
+        """Jobs not yet marked done: still queued, or in a batch that is running or retrying"""
+        queued = self._queue.qsize() if self._queue else 0
+        return queued + self.in_flight
+
+    async def _run_batch(self, kind: str, payloads: List[Any]):
+        """Run a handler on a batch, retrying with exponential backoff before giving up"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.handlers[kind](payloads)
+                self.processed += len(payloads)
+                self.batches += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.failed += len(payloads)
+                    logger.error(f"Task batch '{kind}' of {len(payloads)} failed after {attempt + 1} attempts: {e}")
+                    return
+                self.retries += 1
+                await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'pending': self._queue.qsize() if self._queue else 0,
+            'in_flight': self.in_flight,
+            'capacity': self.max_size,
+            'enqueued': self.enqueued,
+            'rejected': self.rejected,
+            'processed': self.processed,
+            'batches': self.batches,
+            'retries': self.retries,
+            'failed': self.failed
+        }
@@ -45,6 +45,7 @@ const ChatWidget = ({
   const {
     messages,
     sendMessage,
+    prefetch,
     loading,
     currentProvider,
     switchProvider,
@@ -210,7 +211,10 @@ const ChatWidget = ({
           <Input
             ref={inputRef}
             value={input}
-            onChange={(e) => setInput(e.target.value)}
+            onChange={(e) => {
+              setInput(e.target.value);
+              prefetch(e.target.value);
+            }}
             placeholder="Ask about tours, destinations, prices..."
             disabled={loading}
             className="flex-1"
@@ -1,8 +1,12 @@
-import { useState, useCallback } from 'react';
+import { useState, useCallback, useRef, useEffect } from 'react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API_BASE = `${BACKEND_URL}/api`;
 
+// Wait for a pause in typing before warming the backend for the partial query
+const PREFETCH_DEBOUNCE_MS = 300;
+const MIN_PREFETCH_LENGTH = 3;
+
 export const useChatAgent = ({ provider = 'groq', stack = 'travel', theme = {} } = {}) => {
   const [messages, setMessages] = useState([
     {
@@ -14,10 +18,37 @@ export const useChatAgent = ({ provider = 'groq', stack = 'travel', theme = {} }
   const [loading, setLoading] = useState(false);
   const [currentProvider, setCurrentProvider] = useState(provider);
   const [sessionId] = useState(() => `session_${Date.now()}`);
+  const prefetchTimer = useRef(null);
+
+  useEffect(() => () => clearTimeout(prefetchTimer.current), []);
+
+  // Debounced, fire-and-forget warm-up of content search and session setup
+  const prefetch = useCallback((partialQuery) => {
+    clearTimeout(prefetchTimer.current);
+    if (partialQuery.trim().length < MIN_PREFETCH_LENGTH) return;
+
+    prefetchTimer.current = setTimeout(() => {
+      fetch(`${API_BASE}/chat/prefetch`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          query: partialQuery,
+          provider: currentProvider,
+          sessionId,
+          context: { stack }
+        })
+      }).catch(() => {});
+    }, PREFETCH_DEBOUNCE_MS);
+  }, [currentProvider, sessionId, stack]);
 
   const sendMessage = useCallback(async (query) => {
     if (!query.trim() || loading) return;
 
+    // The real request supersedes any pending prefetch
+    clearTimeout(prefetchTimer.current);
+
     const userMessage = {
       role: 'user',
       content: query,
@@ -183,6 +214,7 @@ export const useChatAgent = ({ provider = 'groq', stack = 'travel', theme = {} }
   return {
     messages,
     sendMessage,
+    prefetch,
     loading,
     currentProvider,
     switchProvider,
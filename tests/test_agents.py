@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+from services.agents import AgentBusy, AgentDefinition, AgentManager, AgentQuotaExceeded, AgentRuntime
+from services.contentstack import ContentstackService
+
+
+def make_agent(agent_id, title=None, **kwargs):
+    tour = {
+        'uid': f'{agent_id}_tour',
+        'title': title or f'{agent_id.title()} Tour',
+        'description': 'A guided day out',
+        'price': '$100',
+        'duration': '1 Day',
+        'location': 'Rome, Italy',
+        'highlights': ['Old town'],
+        'category': 'Cultural'
+    }
+    return AgentDefinition(
+        agent_id=agent_id,
+        name=agent_id.title(),
+        system_message=f'{agent_id} bot',
+        contentstack={'sample_data': {'tours': [tour], 'destinations': []}},
+        **kwargs
+    )
+
+
+def make_manager(*agent_ids, **kwargs):
+    manager = AgentManager(**kwargs)
+    for agent_id in agent_ids:
+        manager.register(make_agent(agent_id))
+    return manager
+
+
+def snapshot_mb(agent):
+    runtime = AgentRuntime(agent)
+    asyncio.run(runtime.load())
+    return runtime.memory_bytes / (1024 * 1024)
+
+
+def test_least_recently_used_agent_is_evicted_over_max_loaded():
+    manager = make_manager('a', 'b', 'c', max_loaded=2)
+
+    async def main():
+        await manager.get_runtime('a')
+        await manager.get_runtime('b')
+        await manager.get_runtime('a')
+        await manager.get_runtime('c')
+
+    asyncio.run(main())
+    assert list(manager.runtimes) == ['a', 'c']
+    assert manager.unloads == 1
+
+
+def test_agents_are_evicted_over_memory_budget():
+    # The budget fits one agent snapshot but not two
+    budget_mb = snapshot_mb(make_agent('a')) * 1.5
+    manager = make_manager('a', 'b', memory_budget_mb=budget_mb)
+
+    async def main():
+        await manager.get_runtime('a')
+        await manager.get_runtime('b')
+
+    asyncio.run(main())
+    assert list(manager.runtimes) == ['b']
+
+
+def test_idle_agents_are_unloaded():
+    manager = make_manager('a', 'b', idle_seconds=0)
+
+    async def main():
+        await manager.get_runtime('a')
+        await manager.get_runtime('b')
+
+    asyncio.run(main())
+    assert 'a' not in manager.runtimes
+
+
+def test_agents_in_flight_are_never_unloaded():
+    manager = make_manager('a', 'b', max_loaded=1, idle_seconds=0)
+
+    async def main():
+        runtime = await manager.acquire('a')
+        await manager.get_runtime('b')
+        assert 'a' in manager.runtimes
+
+        manager.release(runtime)
+        await manager.get_runtime('b')
+        assert 'a' not in manager.runtimes
+
+    asyncio.run(main())
+
+
+def test_acquire_rejects_requests_over_max_concurrency():
+    manager = AgentManager()
+    manager.register(make_agent('a', max_concurrency=2))
+
+    async def main():
+        first = await manager.acquire('a')
+        await manager.acquire('a')
+        with pytest.raises(AgentBusy):
+            await manager.acquire('a')
+
+        manager.release(first)
+        await manager.acquire('a')
+
+    asyncio.run(main())
+
+
+def test_agents_search_their_own_content():
+    manager = AgentManager()
+    manager.register(make_agent('wine', title='Barolo Tasting'))
+    manager.register(make_agent('art', title='Uffizi Gallery Visit'))
+
+    async def search(agent_id, query):
+        runtime = await manager.get_runtime(agent_id)
+        results = await runtime.contentstack_service.search_content(query)
+        return [tour['uid'] for tour in results['tours']]
+
+    assert asyncio.run(search('wine', 'barolo')) == ['wine_tour']
+    assert asyncio.run(search('art', 'barolo')) == []
+    assert asyncio.run(search('art', 'uffizi')) == ['art_tour']
+
+
+def test_concurrent_first_requests_share_one_load(monkeypatch):
+    builds = []
+    build_snapshot = ContentstackService.build_snapshot
+
+    async def counting_build_snapshot(self):
+        builds.append(self)
+        await asyncio.sleep(0.01)
+        return await build_snapshot(self)
+
+    monkeypatch.setattr(ContentstackService, 'build_snapshot', counting_build_snapshot)
+    manager = make_manager('a')
+
+    async def main():
+        return await asyncio.gather(*(manager.get_runtime('a') for _ in range(50)))
+
+    runtimes = asyncio.run(main())
+    assert len(builds) == 1
+    assert manager.loads == 1
+    assert all(runtime is runtimes[0] for runtime in runtimes)
+
+
+def test_quota_failures_are_cached(monkeypatch):
+    builds = []
+    build_snapshot = ContentstackService.build_snapshot
+
+    async def counting_build_snapshot(self):
+        builds.append(self)
+        return await build_snapshot(self)
+
+    monkeypatch.setattr(ContentstackService, 'build_snapshot', counting_build_snapshot)
+    manager = AgentManager()
+    manager.register(make_agent('a', max_memory_mb=0))
+
+    async def main():
+        for _ in range(3):
+            with pytest.raises(AgentQuotaExceeded):
+                await manager.get_runtime('a')
+
+    asyncio.run(main())
+    assert len(builds) == 1
+    assert 'a' not in manager.runtimes
+
+    # A new definition is measured again
+    manager.register(make_agent('a'))
+    asyncio.run(manager.get_runtime('a'))
+    assert len(builds) == 2
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from services.deadline import Deadline, DeadlineExceeded, DEFAULT_DEADLINE_SECONDS, MAX_DEADLINE_SECONDS
+
+
+@pytest.mark.parametrize("header", [None, "", "abc", "0", "-5", "nan", "inf", "-inf"])
+def test_invalid_header_falls_back_to_default(header):
+    assert Deadline.from_header(header).budget == DEFAULT_DEADLINE_SECONDS
+
+
+def test_header_is_capped():
+    assert Deadline.from_header("100000").budget == MAX_DEADLINE_SECONDS
+
+
+def test_run_cancels_stage_when_deadline_expires():
+    async def slow_stage():
+        await asyncio.sleep(1)
+
+    deadline = Deadline(0.01)
+    with pytest.raises(DeadlineExceeded) as exc_info:
+        asyncio.run(deadline.run(slow_stage(), 'content search'))
+    assert exc_info.value.stage == 'content search'
+
+
+def test_run_returns_result_within_budget():
+    async def fast_stage():
+        return 'ok'
+
+    assert asyncio.run(Deadline(5).run(fast_stage(), 'prompt build')) == 'ok'
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from services.agents import TRAVEL_FAST_PATH_TEMPLATES
+from services.contentstack import ContentstackService
+from services.fast_path import FastPathService
+
+
+def answer(query, templates=TRAVEL_FAST_PATH_TEMPLATES):
+    return asyncio.run(FastPathService().try_answer(query, ContentstackService(), templates))
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("price of the Venice tour", 'price'),
+    ("how much is the Florence Art Walk?", 'price'),
+    ("tours under $500", 'tour_filter'),
+    ("cultural tours in Rome", 'tour_filter'),
+    ("what categories do you have", 'categories'),
+])
+def test_lookup_queries_take_fast_path(query, intent):
+    result = answer(query)
+    assert result is not None
+    assert result['intent'] == intent
+
+
+@pytest.mark.parametrize("query", [
+    "What's the cancellation policy for the Rome tour?",
+    "Can I bring kids on the Florence tour",
+    "Is the Rome tour available in winter?",
+    "Recommend a romantic trip",
+    "Tell me about Italy",
+    "tours in Rome or Venice",
+    "romantic or cultural tours",
+    "price of the rome city tour or the venice tour",
+    "price of rome and venice tours",
+])
+def test_other_questions_fall_through_to_llm(query):
+    assert answer(query) is None
+
+
+def test_price_filter_matches_get_tours():
+    result = answer("tours under $400")
+    assert result['related_content'] == ['venice_gondola_experience']
+
+
+def test_agents_without_templates_skip_fast_path():
+    assert answer("what categories do you have", templates=None) is None
+
+
+def test_metrics_count_hits_and_misses():
+    service = FastPathService()
+    contentstack_service = ContentstackService()
+    asyncio.run(service.try_answer("tours under $500", contentstack_service, TRAVEL_FAST_PATH_TEMPLATES))
+    asyncio.run(service.try_answer("Can I bring kids on the Florence tour", contentstack_service, TRAVEL_FAST_PATH_TEMPLATES))
+
+    metrics = service.get_metrics()
+    assert metrics['hits'] == 1
+    assert metrics['misses'] == 1
+    assert metrics['hit_rate'] == 0.5
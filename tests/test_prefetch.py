@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("emergentintegrations")
+
+from services.agents import TRAVEL_AGENT, AgentRuntime
+from services.deadline import Deadline
+from services.llm import LLMService
+from services.prefetch import PrefetchService
+
+
+class RecordingChat:
+    def __init__(self, provider):
+        self.provider = provider
+        self.sent = []
+
+    async def send_message(self, message):
+        self.sent.append(message.text)
+        return "ok"
+
+
+@pytest.fixture
+def llm_service(monkeypatch):
+    monkeypatch.setenv('EMERGENT_LLM_KEY', 'test-key')
+    service = LLMService()
+    service.created_chats = []
+
+    async def create_chat_session(session_id, provider=None, agent=None):
+        chat = RecordingChat(service.resolve_provider(provider, agent))
+        service.created_chats.append(chat)
+        return chat
+
+    monkeypatch.setattr(service, 'create_chat_session', create_chat_session)
+    return service
+
+
+@pytest.fixture
+def runtime():
+    runtime = AgentRuntime(TRAVEL_AGENT)
+    asyncio.run(runtime.load())
+    return runtime
+
+
+def test_prefetched_content_expires(llm_service, runtime):
+    service = PrefetchService(llm_service, ttl=0.05)
+
+    async def main():
+        await service.prefetch(runtime, "Rome ", None)
+        assert service.take_content('travel', "rome") is not None
+        await asyncio.sleep(0.1)
+        assert service.take_content('travel', "rome") is None
+
+    asyncio.run(main())
+    assert service.get_metrics()['cached_content'] == 0
+
+
+def test_prefetched_session_is_used_once(llm_service, runtime):
+    service = PrefetchService(llm_service)
+    asyncio.run(service.prefetch(runtime, "rome", 's1'))
+
+    assert service.take_session('travel', 's1', 'groq') is not None
+    assert service.take_session('travel', 's1', 'groq') is None
+
+
+def test_prefetched_session_matches_provider(llm_service, runtime):
+    service = PrefetchService(llm_service)
+    asyncio.run(service.prefetch(runtime, "rome", 's1', provider='openai'))
+
+    assert service.take_session('travel', 's1', 'groq') is None
+    chat = service.take_session('travel', 's1', 'openai')
+    assert chat.provider == 'openai'
+
+
+def test_prefetches_over_the_concurrency_limit_are_skipped(llm_service, runtime, monkeypatch):
+    create_chat_session = llm_service.create_chat_session
+
+    async def slow_create_chat_session(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return await create_chat_session(*args, **kwargs)
+
+    monkeypatch.setattr(llm_service, 'create_chat_session', slow_create_chat_session)
+    service = PrefetchService(llm_service, max_concurrent=1)
+
+    async def main():
+        return await asyncio.gather(
+            service.prefetch(runtime, "rome", 's1'),
+            service.prefetch(runtime, "venice", 's2')
+        )
+
+    assert asyncio.run(main()) == [True, False]
+    metrics = service.get_metrics()
+    assert metrics['skipped'] == 1
+    assert metrics['in_flight'] == 0
+
+
+def test_prefetched_context_is_ignored_when_deadline_is_low(llm_service, runtime):
+    service = PrefetchService(llm_service)
+    asyncio.run(service.prefetch(runtime, "italy", 's1'))
+    entry = service.take_content('travel', "italy")
+    assert "AVAILABLE DESTINATIONS" in entry['context_str']
+
+    chat = service.take_session('travel', 's1', 'groq')
+    response = asyncio.run(llm_service.get_chat_response(
+        "italy", 's1',
+        content_context=entry['content_context'],
+        deadline=Deadline(1),
+        agent=TRAVEL_AGENT,
+        chat=chat,
+        context_str=entry['context_str']
+    ))
+
+    assert response['degraded']
+    # A fresh session on the fastest provider gets the smaller prompt, not the prefetched one
+    assert chat.sent == []
+    degraded_chat = llm_service.created_chats[-1]
+    assert degraded_chat is not chat
+    assert entry['context_str'] not in degraded_chat.sent[0]
+    assert "AVAILABLE DESTINATIONS" not in degraded_chat.sent[0]
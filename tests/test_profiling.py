@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from services.profiling import ProfilingMiddleware, ProfilingService
+
+
+def make_service():
+    service = ProfilingService()
+    service.enabled = True
+    return service
+
+
+def http_scope(profile=True):
+    headers = [(b'x-profile', b'1')] if profile else []
+    return {'type': 'http', 'path': '/api/chat/stream', 'headers': headers}
+
+
+async def receive():
+    return {'type': 'http.disconnect'}
+
+
+def test_profile_is_recorded_with_id_header():
+    service = make_service()
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'ok'})
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(ProfilingMiddleware(app, service)(http_scope(), receive, send))
+
+    profile_id = dict(sent[0]['headers'])[b'x-profile-id'].decode()
+    assert service.get_profile(profile_id)['path'] == '/api/chat/stream'
+    assert service.active_profiles == 0
+    assert service.in_flight_requests == 0
+
+
+def test_profile_finishes_when_body_is_never_sent():
+    service = make_service()
+
+    async def app(scope, receive, send):
+        # Client went away before the first chunk
+        raise asyncio.CancelledError()
+
+    async def send(message):
+        pass
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(ProfilingMiddleware(app, service)(http_scope(), receive, send))
+
+    assert service.active_profiles == 0
+    assert len(service.list_profiles()) == 1
+
+
+def test_unprofiled_requests_pass_through():
+    service = make_service()
+
+    async def app(scope, receive, send):
+        pass
+
+    async def send(message):
+        pass
+
+    asyncio.run(ProfilingMiddleware(app, service)(http_scope(profile=False), receive, send))
+    assert service.list_profiles() == []
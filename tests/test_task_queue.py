@@ -0,0 +1,47 @@
+import asyncio
+import logging
+
+from services.task_queue import TaskQueue
+
+
+def test_drain_timeout_counts_batches_still_retrying(caplog):
+    async def failing_handler(payloads):
+        raise RuntimeError("database unavailable")
+
+    async def main():
+        queue = TaskQueue(workers=1, max_retries=5, retry_backoff=10)
+        queue.register_handler('metrics', failing_handler)
+        queue.start()
+        assert queue.enqueue('metrics', {'latency_ms': 1})
+        assert queue.enqueue('metrics', {'latency_ms': 2})
+        await asyncio.sleep(0)
+
+        # Both jobs were taken off the queue into a single batch that is now backing off
+        assert queue.get_stats()['pending'] == 0
+        assert queue.unfinished() == 2
+        await queue.drain(timeout=0.05)
+
+    with caplog.at_level(logging.WARNING, logger='services.task_queue'):
+        asyncio.run(main())
+    assert "2 jobs not done (0 queued, 2 in flight)" in caplog.text
+
+
+def test_drain_waits_for_batches_to_finish():
+    processed = []
+
+    async def handler(payloads):
+        await asyncio.sleep(0.01)
+        processed.extend(payloads)
+
+    async def main():
+        queue = TaskQueue(workers=2)
+        queue.register_handler('transcript', handler)
+        queue.start()
+        for i in range(5):
+            queue.enqueue('transcript', i)
+        await queue.drain(timeout=1)
+        assert queue.unfinished() == 0
+        assert not queue.enqueue('transcript', 5)
+
+    asyncio.run(main())
+    assert sorted(processed) == [0, 1, 2, 3, 4]